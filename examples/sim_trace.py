@@ -1,7 +1,7 @@
 import numpy as np
 
 from simfaas.SimProcess import ExpSimProcess
-from simfaas.FunctionInstance import FunctionInstance
+from simfaas.FunctionInstance import FunctionInstance, IDLE
 from simfaas.ServerlessTemporalSimulator import ServerlessTemporalSimulator
 from simfaas.ServerlessSimulator import ServerlessSimulator
 
@@ -34,7 +34,7 @@ def generate_trace():
                                 expiration_threshold
                                 )
 
-        f.state = 'IDLE'
+        f.state = IDLE
         f.is_cold = False
         # when will it be destroyed if no requests
         f.next_termination = 300
@@ -50,7 +50,7 @@ def generate_trace():
                                 expiration_threshold
                                 )
 
-        f.state = 'IDLE'
+        f.state = IDLE
         f.is_cold = False
         # transition it into running mode
         f.arrival_transition(0)
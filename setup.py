@@ -28,6 +28,9 @@ setuptools.setup(
     long_description=open('README.rst').read(),
     packages=setuptools.find_packages(),
     install_requires=reqs,
+    extras_require={
+        'jit': ['numba>=0.50'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Programming Language :: Python',
@@ -1,5 +1,13 @@
 
 
+# states of a function instance, kept as integers to keep comparisons cheap
+COLD = 0
+WARM = 1
+IDLE = 2
+TERM = 3
+STATE_NAMES = ('COLD', 'WARM', 'IDLE', 'TERM')
+
+
 class FunctionInstance:
     """FunctionInstance aims to simulate the behaviour of a function instance in a serverless platform, with all the internal transitions necessary.
 
@@ -14,6 +22,12 @@ class FunctionInstance:
     expiration_threshold : float
         The amount of time it takes for an instance to get expired and the resources consumed by it released after processing the last request
     """
+    __slots__ = (
+        'cold_service_process', 'warm_service_process', 'expiration_threshold',
+        'creation_time', 'state', 'is_busy', 'is_cold',
+        'next_departure', 'next_termination', 'version', 'rank', 'pos',
+    )
+
     def __init__(self, t, cold_service_process, warm_service_process, expiration_threshold):
         super().__init__()
 
@@ -25,10 +39,18 @@ class FunctionInstance:
         self.creation_time = t
 
         # set current state variables
-        self.state = 'COLD'
+        self.state = COLD
         self.is_busy = True
         self.is_cold = True
 
+        # bumped by the simulator whenever the next transition is rescheduled,
+        # so that outdated entries in its event queue can be recognized
+        self.version = 0
+        # order in which the instance joined the simulated platform, set by the simulator
+        self.rank = 0
+        # index of the instance in the list of servers of the simulator, set by the simulator
+        self.pos = 0
+
         # calculate departure and expected termination on each arrival
         self.generate_cold_departure(t)
         self.update_next_termination()
@@ -44,7 +66,7 @@ class FunctionInstance:
         self.next_departure = t + self.cold_service_process.generate_trace()
 
     def __str__(self):
-        return f"State: {self.state} \t Departure: {self.next_departure:8.2f} \t Termination: {self.next_termination:8.2f}"
+        return f"State: {STATE_NAMES[self.state]} \t Departure: {self.next_departure:8.2f} \t Termination: {self.next_termination:8.2f}"
 
     def get_life_span(self):
         """Get the lifespan of the instance (from creation until the termination)
@@ -76,8 +98,8 @@ class FunctionInstance:
 
         Returns
         -------
-        str
-            currentstate
+        int
+            current state, one of `COLD`, `WARM`, `IDLE` or `TERM`
         """
         return self.state
 
@@ -94,14 +116,16 @@ class FunctionInstance:
         Exception
             Raises if currently process a request by being in `COLD` or `WARM` states
         """
-        if self.state == 'COLD' or self.state == 'WARM':
+        if self.state == COLD or self.state == WARM:
             raise Exception('instance is already busy!')
 
-        elif self.state == 'IDLE':
-            self.state = 'WARM'
+        elif self.state == IDLE:
+            self.state = WARM
             self.is_busy = True
-            self.next_departure = t + self.warm_service_process.generate_trace()
-            self.update_next_termination()
+            # same as update_next_termination, written out to save a call on every warm start
+            next_departure = t + self.warm_service_process.generate_trace()
+            self.next_departure = next_departure
+            self.next_termination = next_departure + self.expiration_threshold
 
     def is_idle(self):
         """Whether or not the instance is currently idle, and thus can accept new requests.
@@ -111,7 +135,7 @@ class FunctionInstance:
         bool
             True if idle, false otherwise
         """
-        return self.state == 'IDLE'
+        return self.state == IDLE
 
     def is_ready(self):
         """Whether or not the instance is ready to accept new requests. Here, same as is_idle()
@@ -128,7 +152,7 @@ class FunctionInstance:
 
         Returns
         -------
-        str
+        int
             The state after making the internal transition
 
         Raises
@@ -137,14 +161,14 @@ class FunctionInstance:
             Raises if already in `TERM` state, since no other internal transitions are possible
         """
         # next transition is a departure
-        if self.state == 'COLD' or self.state == 'WARM':
-            self.state = 'IDLE'
+        if self.state == COLD or self.state == WARM:
+            self.state = IDLE
             self.is_busy = False
             self.is_cold = False
 
         # next transition is a termination
-        elif self.state == 'IDLE':
-            self.state = 'TERM'
+        elif self.state == IDLE:
+            self.state = TERM
             self.is_busy = False
 
         # if terminated
@@ -167,10 +191,24 @@ class FunctionInstance:
             The seconds remaining until the next transition
         """
         # next transition would be termination
-        if self.state == 'IDLE':
-            return self.get_next_termination(t)
+        if self.state == IDLE:
+            return self.next_termination - t
+        # next transition would be departure
+        return self.next_departure - t
+
+    def get_next_transition_abstime(self):
+        """Get the time at which the next transition happens.
+
+        Returns
+        -------
+        float
+            The simulation time of the next transition
+        """
+        # next transition would be termination
+        if self.state == IDLE:
+            return self.next_termination
         # next transition would be departure
-        return self.get_next_departure(t)
+        return self.next_departure
 
     def get_next_departure(self, t):
         """Get the time until the next departure
@@ -188,10 +226,11 @@ class FunctionInstance:
         Raises
         ------
         Exception
-            Raises if called after the departure
+            Raises if called after the departure, unless running with `python -O`
         """
-        if t > self.next_departure:
-            raise Exception("current time is after departure!")
+        if __debug__:
+            if t > self.next_departure:
+                raise Exception("current time is after departure!")
         return self.next_departure - t
 
     def get_next_termination(self, t):
@@ -210,8 +249,9 @@ class FunctionInstance:
         Raises
         ------
         Exception
-            Raises if called after the termination
+            Raises if called after the termination, unless running with `python -O`
         """
-        if t > self.next_termination:
-            raise Exception("current time is after termination!")
+        if __debug__:
+            if t > self.next_termination:
+                raise Exception("current time is after termination!")
         return self.next_termination - t
\ No newline at end of file
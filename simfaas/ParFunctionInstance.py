@@ -1,4 +1,4 @@
-from simfaas.FunctionInstance import FunctionInstance
+from simfaas.FunctionInstance import FunctionInstance, COLD, WARM, IDLE, TERM, STATE_NAMES
 
 class ParFunctionInstance(FunctionInstance):
     """ParFunctionInstance aims to simulate the behaviour of a function instance in a serverless platform, with all the internal transitions necessary allowing multiple requests to be parsed. For other input parameters, refer to :class:`~simfaas.FunctionInstance.FunctionInstance`.
@@ -10,6 +10,8 @@ class ParFunctionInstance(FunctionInstance):
     concurrency_value : int
         The number of parallel requests that a single instance can handle.
     """
+    __slots__ = ('concurrency_value', 'cold_end')
+
     def __init__(self, concurrency_value, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -17,7 +19,7 @@ class ParFunctionInstance(FunctionInstance):
         self.concurrency_value = concurrency_value
 
     def __str__(self):
-        return f"State: {self.state} \t Cold End: {self.cold_end:8.2f} \t Next Transition: {self.get_next_transition_time():8.2f} \t Termination: {self.next_termination:8.2f} \t Departure: {','.join([f'{s:.2f}' for s in self.next_departure])}"
+        return f"State: {STATE_NAMES[self.state]} \t Cold End: {self.cold_end:8.2f} \t Next Transition: {self.get_next_transition_time():8.2f} \t Termination: {self.next_termination:8.2f} \t Departure: {','.join([f'{s:.2f}' for s in self.next_departure])}"
 
     def generate_cold_departure(self, t):
         # calculate departure and expected termination on each arrival
@@ -41,7 +43,7 @@ class ParFunctionInstance(FunctionInstance):
         return self._get_running_reqs()
 
     def arrival_transition(self, t):
-        if self.state == 'COLD' or self.state == 'WARM':
+        if self.state == COLD or self.state == WARM:
             if not self.is_ready():
                 raise Exception('instance is already at full capacity!')
             else:
@@ -49,8 +51,8 @@ class ParFunctionInstance(FunctionInstance):
                 self.next_departure += [max(t, self.cold_end) + self.warm_service_process.generate_trace()]
                 self.update_next_termination()
 
-        elif self.state == 'IDLE':
-            self.state = 'WARM'
+        elif self.state == IDLE:
+            self.state = WARM
             self.is_busy = True
             self.next_departure = [t + self.warm_service_process.generate_trace()]
             self.update_next_termination()
@@ -60,25 +62,25 @@ class ParFunctionInstance(FunctionInstance):
 
     def make_transition(self):
         # next transition is a departure
-        if self.state == 'COLD':
-            self.state = 'WARM'
+        if self.state == COLD:
+            self.state = WARM
             self.is_cold = False
 
-        elif self.state == 'WARM':
+        elif self.state == WARM:
             if self._get_running_reqs() > 1:
                 idxmin = self.next_departure.index(min(self.next_departure))
                 del self.next_departure[idxmin]
             elif self._get_running_reqs() == 1:
                 # if only 1 request, then we go to idle mode
                 del self.next_departure[0]
-                self.state = 'IDLE'
+                self.state = IDLE
                 self.is_busy = False
             else:
                 raise Exception("Invalid state!")
 
         # next transition is a termination
-        elif self.state == 'IDLE':
-            self.state = 'TERM'
+        elif self.state == IDLE:
+            self.state = TERM
             self.is_busy = False
 
         # if terminated
@@ -89,14 +91,25 @@ class ParFunctionInstance(FunctionInstance):
 
     def get_next_transition_time(self, t=0):
         # next transition would be termination
-        if self.state == 'IDLE':
-            return self.get_next_termination(t)
-        elif self.state == 'COLD':
+        if self.state == IDLE:
+            return self.next_termination - t
+        elif self.state == COLD:
             return self.cold_end - t
         # next transition would be departure
-        return self.get_next_departure(t)
+        return min(self.next_departure) - t
+
+    def get_next_transition_abstime(self):
+        # next transition would be termination
+        if self.state == IDLE:
+            return self.next_termination
+        elif self.state == COLD:
+            return self.cold_end
+        # next transition would be departure
+        return min(self.next_departure)
 
     def get_next_departure(self, t):
-        if t > min(self.next_departure):
-            raise Exception("current time is after departure!")
-        return min(self.next_departure) - t
+        next_departure = min(self.next_departure)
+        if __debug__:
+            if t > next_departure:
+                raise Exception("current time is after departure!")
+        return next_departure - t
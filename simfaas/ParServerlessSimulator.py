@@ -1,7 +1,5 @@
 # The main simulator for serverless computing platforms
 
-import numpy as np
-
 from simfaas.ServerlessSimulator import ServerlessSimulator
 from simfaas.ParFunctionInstance import ParFunctionInstance
 
@@ -39,7 +37,9 @@ class ParServerlessSimulator(ServerlessSimulator):
         self.server_count += 1
         self.running_count += 1
         new_server = ParFunctionInstance(self.concurrency_value, t, self.cold_service_process, self.warm_service_process, self.expiration_threshold)
+        new_server.pos = len(self.servers)
         self.servers.append(new_server)
+        self.schedule_transition(new_server)
 
     def reset_trace(self):
         """resets all the historical data to prepare the class for a new simulation with additional functionality added to base class.
@@ -60,8 +60,9 @@ class ParServerlessSimulator(ServerlessSimulator):
         conc_levels = [s.get_concurrency() for s in self.servers]
         self.hist_conc_levels.append(conc_levels)
 
+        # plain python is faster than numpy for the handful of instances usually present
         if len(conc_levels) > 0:
-            conc_level_avg = np.mean(conc_levels)
+            conc_level_avg = sum(conc_levels) / len(conc_levels)
         else:
             conc_level_avg = -1
 
@@ -105,6 +106,36 @@ class ParServerlessSimulator(ServerlessSimulator):
         # average concurrency value
         print(f"Average Concurrency Value: \t {self.get_average_conc_avgs():.4f}")
     
+    def release_instance(self, server):
+        """No idle pool is kept since busy instances below their concurrency value can accept requests as well, see :func:`schedule_warm_instance`.
+
+        Parameters
+        ----------
+        server : simfaas.ParFunctionInstance.ParFunctionInstance
+            The instance that has just become idle
+        """
+        pass
+
+    def schedule_warm_instance(self, t):
+        """Goes through a process to determine which ready instance should process the incoming request.
+
+        Parameters
+        ----------
+        t : float
+            The time at which the scheduling is happening
+
+        Returns
+        -------
+        simfaas.ParFunctionInstance.ParFunctionInstance
+            The function instances that the scheduler has selected for the incoming request.
+        """
+        # find the newest ready instance in a single pass
+        newest = None
+        for s in self.servers:
+            if s.is_ready() and (newest is None or s.creation_time > newest.creation_time):
+                newest = s
+        return newest
+
     def is_warm_available(self, t):
         """Whether we have at least one available instance in the warm pool that can process requests
 
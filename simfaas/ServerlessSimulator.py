@@ -1,7 +1,13 @@
 # The main simulator for serverless computing platforms
 
 from simfaas.SimProcess import ExpSimProcess
-from simfaas.FunctionInstance import FunctionInstance
+from simfaas.FunctionInstance import FunctionInstance, COLD, WARM, IDLE, TERM, STATE_NAMES
+from simfaas import TraceKernel
+import heapq
+import itertools
+from collections import deque
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
 
@@ -24,6 +30,8 @@ class ServerlessSimulator:
         The maximum amount of time for which the simulation should continue, by default 24*60*60 (24 hours)
     maximum_concurrency : int, optional
         The maximum number of concurrently executing function instances allowed on the system This will be used to determine when a rejection of request should happen due to lack of capacity, by default 1000
+    use_jit : bool, optional
+        Whether or not to generate traces using the compiled kernel in :mod:`simfaas.TraceKernel` when possible (requires `numba`), by default True
 
     Raises
     ------
@@ -38,7 +46,7 @@ class ServerlessSimulator:
     """
     def __init__(self, arrival_process=None, warm_service_process=None, 
             cold_service_process=None, expiration_threshold=600, max_time=24*60*60,
-            maximum_concurrency=1000, **kwargs):
+            maximum_concurrency=1000, use_jit=True, **kwargs):
         super().__init__()
         
         # setup arrival process
@@ -75,6 +83,7 @@ class ServerlessSimulator:
         self.expiration_threshold = expiration_threshold
         self.max_time = max_time
         self.maximum_concurrency = maximum_concurrency
+        self.use_jit = use_jit
 
         # reset trace values
         self.reset_trace()
@@ -82,8 +91,14 @@ class ServerlessSimulator:
     def reset_trace(self):
         """resets all the historical data to prepare the class for a new simulation
         """
-        # an archive of previous servers
-        self.prev_servers = []
+        # samples buffered by the processes would otherwise carry over into the next simulation
+        self.arrival_process.reset()
+        self.warm_service_process.reset()
+        self.cold_service_process.reset()
+        # an archive of previous servers, only keeping what is needed for their life spans
+        self.prev_creation = np.empty(64, dtype=np.float64)
+        self.prev_termination = np.empty(64, dtype=np.float64)
+        self.prev_count = 0
         self.total_req_count = 0
         self.total_cold_count = 0
         self.total_warm_count = 0
@@ -101,6 +116,13 @@ class ServerlessSimulator:
         self.hist_req_cold_idxs = []
         self.hist_req_warm_idxs = []
         self.hist_req_rej_idxs = []
+        # event queue holding the next internal transition of each instance
+        self.event_heap = []
+        self.event_seq = 0
+        # terminations of idle instances in the order they are due, see schedule_transition
+        self.termination_queue = deque()
+        # idle instances available to the scheduler, newest instance first
+        self.idle_heap = []
 
     def has_server(self):
         """Returns True if there are still instances (servers) in the simulated platform, False otherwise.
@@ -125,6 +147,88 @@ class ServerlessSimulator:
         """
         return self.arrival_process.generate_trace()
 
+    def generate_arrivals(self, t, count=4096):
+        """Generate the times of the next `count` arrivals after `t`, drawing all inter-arrivals in one batch from `self.arrival_process`.
+
+        Parameters
+        ----------
+        t : float
+            The time of the last arrival
+        count : int, optional
+            The number of arrivals to generate, by default 4096
+
+        Returns
+        -------
+        list[float]
+            The sorted arrival times
+        """
+        inter_arrivals = self.arrival_process.generate_traces(count)
+        return (t + np.cumsum(inter_arrivals)).tolist()
+
+    def schedule_transition(self, server):
+        """Push the next internal transition of `server` into the event queue. Any event previously scheduled for the same instance becomes outdated and will be discarded when it reaches the top of the queue. Events due at the same time are handled in scheduling order, not in the order of `servers`, which keeps traces reproducible for a given seed.
+
+        Terminations are due a fixed `expiration_threshold` after the departure that made the instance idle, and departures are handled in time order, so they usually arrive already sorted. Those are appended to `termination_queue` in constant time instead of going through the heap.
+
+        Parameters
+        ----------
+        server : simfaas.FunctionInstance.FunctionInstance
+            The instance whose next transition should be scheduled
+        """
+        # first time the instance is scheduled, so it has just joined the platform
+        if server.version == 0:
+            server.rank = self.event_seq
+        server.version += 1
+        # the sequence number is unique, so it settles ties between events due at the same
+        # time in scheduling order and tuple comparison never falls through to the instances
+        event = (server.get_next_transition_abstime(), self.event_seq, server.version, server)
+        self.event_seq += 1
+        if server.state == IDLE:
+            termination_queue = self.termination_queue
+            if not termination_queue or termination_queue[-1] < event:
+                termination_queue.append(event)
+                return
+        heapq.heappush(self.event_heap, event)
+
+    def release_instance(self, server):
+        """Make an idle instance available to :func:`schedule_warm_instance`.
+
+        Parameters
+        ----------
+        server : simfaas.FunctionInstance.FunctionInstance
+            The instance that has just become idle
+        """
+        # among instances created at the same time, the one that joined the platform first is chosen
+        entry = (-server.creation_time, server.rank, server.version, server)
+        idle_heap = self.idle_heap
+        heapq.heappush(idle_heap, entry)
+        # terminated instances sink below newer ones and are never popped, drop
+        # outdated entries once they outnumber the ones of idle instances
+        if len(idle_heap) > 2 * self.idle_count + 64:
+            idle_heap[:] = [e for e in idle_heap if e[2] == e[3].version and e[3].is_idle()]
+            heapq.heapify(idle_heap)
+
+    def archive_instance(self, server):
+        """Record the creation and termination times of a terminated instance in the archive of previous servers.
+
+        Parameters
+        ----------
+        server : simfaas.FunctionInstance.FunctionInstance
+            The instance that has just been terminated
+        """
+        n = self.prev_count
+        if n == len(self.prev_creation):
+            prev_creation = np.empty(2 * n, dtype=np.float64)
+            prev_creation[:n] = self.prev_creation
+            self.prev_creation = prev_creation
+            prev_termination = np.empty(2 * n, dtype=np.float64)
+            prev_termination[:n] = self.prev_termination
+            self.prev_termination = prev_termination
+
+        self.prev_creation[n] = server.creation_time
+        self.prev_termination[n] = server.next_termination
+        self.prev_count += 1
+
     def cold_start_arrival(self, t):
         """Goes through the process necessary for a cold start arrival which includes generation of a new function instance in the `COLD` state and adding it to the cluster.
 
@@ -147,7 +251,9 @@ class ServerlessSimulator:
         self.server_count += 1
         self.running_count += 1
         new_server = FunctionInstance(t, self.cold_service_process, self.warm_service_process, self.expiration_threshold)
+        new_server.pos = len(self.servers)
         self.servers.append(new_server)
+        self.schedule_transition(new_server)
 
     def schedule_warm_instance(self, t):
         """Goes through a process to determine which warm instance should process the incoming request.
@@ -162,14 +268,12 @@ class ServerlessSimulator:
         simfaas.FunctionInstance.FunctionInstance
             The function instances that the scheduler has selected for the incoming request.
         """
-        idle_instances = [s for s in self.servers if s.is_ready()]
-        creation_times = [s.creation_time for s in idle_instances]
-        
-        # scheduling mechanism
-        creation_times = np.array(creation_times)
-        # find the newest instance
-        idx = np.argmax(creation_times)
-        return idle_instances[idx]
+        # the newest idle instance is on top, entries of instances that have
+        # been terminated or rescheduled since their release are discarded
+        while True:
+            _, _, version, instance = heapq.heappop(self.idle_heap)
+            if version == instance.version and instance.is_idle():
+                return instance
 
     def warm_start_arrival(self, t):
         """Goes through the process necessary for a warm start arrival which includes selecting a warm instance for processing and recording the request information.
@@ -193,6 +297,7 @@ class ServerlessSimulator:
         instance = self.schedule_warm_instance(t)
         was_idle = instance.is_idle()
         instance.arrival_transition(t)
+        self.schedule_transition(instance)
 
         # transition from idle to running
         self.total_warm_count += 1
@@ -419,6 +524,17 @@ class ServerlessSimulator:
         return self.total_cold_count / self.total_req_count
 
 
+    def get_life_spans(self):
+        """Get the life span of each terminated instance, from its creation until its expiration.
+
+        Returns
+        -------
+        numpy.ndarray
+            The life spans of the previous servers
+        """
+        n = self.prev_count
+        return self.prev_termination[:n] - self.prev_creation[:n]
+
     def get_average_lifespan(self):
         """Get the average lifespan of each instance, calculated by the amount of time from creation of instance, until its expiration.
 
@@ -427,8 +543,7 @@ class ServerlessSimulator:
         float
             The average lifespan
         """
-        life_spans = np.array([s.get_life_span() for s in self.prev_servers])
-        return life_spans.mean()
+        return self.get_life_spans().mean()
 
     
     def get_result_dict(self):
@@ -464,7 +579,7 @@ class ServerlessSimulator:
         print(f"Rejection Probability: \t\t {self.total_reject_count / self.total_req_count:.4f}")
 
         # average instance life span
-        life_spans = np.array([s.get_life_span() for s in self.prev_servers])
+        life_spans = self.get_life_spans()
         if len(life_spans) > 0:
             print(f"Average Instance Life Span: \t {life_spans.mean():.4f}")
 
@@ -576,6 +691,103 @@ class ServerlessSimulator:
         self.hist_server_idle_count.append(self.idle_count)
 
 
+    # methods taking part in the event loop, child classes overriding any of them can't use the trace kernel
+    kernel_hooks = [
+        'req', 'generate_arrivals', 'has_server', 'trace_condition', 'is_warm_available', 'update_hist_arrays',
+        'cold_start_arrival', 'warm_start_arrival', 'schedule_warm_instance',
+        'schedule_transition', 'release_instance', 'generate_trace',
+    ]
+
+    def can_use_trace_kernel(self):
+        """Whether the trace can be generated by the compiled kernel in :mod:`simfaas.TraceKernel`. This requires `numba`, exponential arrival and service processes, plain :class:`~simfaas.FunctionInstance.FunctionInstance` instances and a fresh history. Child classes overriding any of `kernel_hooks` are excluded since the kernel is unaware of their customizations.
+
+        Returns
+        -------
+        bool
+            True if :func:`generate_trace_kernel` can be used, False otherwise
+        """
+        if not self.use_jit or TraceKernel.numba is None:
+            return False
+        for name in self.kernel_hooks:
+            if getattr(self.__class__, name) is not getattr(ServerlessSimulator, name):
+                return False
+        processes = [self.arrival_process, self.warm_service_process, self.cold_service_process]
+        if any(p.__class__ != ExpSimProcess for p in processes):
+            return False
+        if any(s.__class__ != FunctionInstance for s in self.servers):
+            return False
+        return len(self.hist_times) == 0
+
+    def restore_instance(self, creation_time, state, next_departure, next_termination):
+        """Create a function instance in the given state, used to recover instances simulated by the trace kernel.
+
+        Parameters
+        ----------
+        creation_time : float
+            The time at which the instance has been created
+        state : int
+            The state of the instance
+        next_departure : float
+            The departure of the last request processed by the instance
+        next_termination : float
+            The scheduled termination of the instance
+
+        Returns
+        -------
+        simfaas.FunctionInstance.FunctionInstance
+            The recovered function instance
+        """
+        f = FunctionInstance(creation_time, self.cold_service_process, self.warm_service_process, self.expiration_threshold)
+        f.state = state
+        f.is_busy = state == COLD or state == WARM
+        f.is_cold = state == COLD
+        f.next_departure = next_departure
+        f.next_termination = next_termination
+        return f
+
+    def generate_trace_kernel(self):
+        """Generate a sample trace using :func:`simfaas.TraceKernel.run_exp_trace`, filling the same historical records as :func:`generate_trace`.
+        """
+        # instances already in the platform, stored column-wise for the kernel
+        init_creation = np.array([s.creation_time for s in self.servers], dtype=np.float64)
+        init_departure = np.array([s.next_departure for s in self.servers], dtype=np.float64)
+        init_termination = np.array([s.next_termination for s in self.servers], dtype=np.float64)
+        init_state = np.array([s.state for s in self.servers], dtype=np.int8)
+
+        # the kernel has its own random state, seed it from numpy to keep traces reproducible
+        seed = np.random.randint(2**31 - 1)
+        (hist_times, hist_server_count, hist_running_count, hist_idle_count, hist_req,
+            prev_creation, prev_termination, creation, departure, termination, state) = TraceKernel.run_exp_trace(
+            seed, float(self.max_time), float(self.arrival_process.rate), float(self.warm_service_process.rate),
+            float(self.cold_service_process.rate), float(self.expiration_threshold), float(self.maximum_concurrency),
+            init_creation, init_departure, init_termination, init_state)
+
+        self.hist_times = hist_times.tolist()
+        self.hist_server_count = hist_server_count.tolist()
+        self.hist_server_running_count = hist_running_count.tolist()
+        self.hist_server_idle_count = hist_idle_count.tolist()
+        self.hist_req_cold_idxs = np.flatnonzero(hist_req == TraceKernel.KERNEL_REQ_COLD).tolist()
+        self.hist_req_warm_idxs = np.flatnonzero(hist_req == TraceKernel.KERNEL_REQ_WARM).tolist()
+        self.hist_req_rej_idxs = np.flatnonzero(hist_req == TraceKernel.KERNEL_REQ_REJ).tolist()
+
+        self.total_cold_count = len(self.hist_req_cold_idxs)
+        self.total_warm_count = len(self.hist_req_warm_idxs)
+        self.total_reject_count = len(self.hist_req_rej_idxs)
+        self.total_req_count = self.total_cold_count + self.total_warm_count + self.total_reject_count
+
+        self.prev_creation = prev_creation
+        self.prev_termination = prev_termination
+        self.prev_count = len(prev_creation)
+
+        self.servers = []
+        for c, s, dep, term in zip(creation.tolist(), state.tolist(), departure.tolist(), termination.tolist()):
+            self.servers.append(self.restore_instance(c, s, dep, term))
+
+        self.server_count = len(self.servers)
+        self.idle_count = int((state == IDLE).sum())
+        self.running_count = self.server_count - self.idle_count
+        self.calculate_time_lengths()
+
     def generate_trace(self, debug_print=False, progress=False):
         """Generate a sample trace.
 
@@ -595,72 +807,147 @@ class ServerlessSimulator:
         if progress:
             pbar = tqdm(total=int(self.max_time))
 
+        # the compiled kernel cannot report on the way, so it is skipped for debugging
+        if not debug_print and self.can_use_trace_kernel():
+            self.generate_trace_kernel()
+            if progress:
+                pbar.update(int(self.max_time))
+                pbar.close()
+            return
+
         t = 0
         pbar_t_update = 0
         pbar_interval = int(self.max_time / 100)
-        next_arrival = t + self.req()
-        while self.trace_condition(t):
+        # arrivals are generated ahead of time and walked through in order,
+        # only the transitions of instances need the event queue
+        arrivals = self.generate_arrivals(t)
+        arrival_idx = 0
+        next_arrival = arrivals[arrival_idx]
+
+        # build the event queue and idle pool from the instances already in the platform, scheduled
+        # in list order, later ties are handled in scheduling order
+        self.event_heap = []
+        self.termination_queue = deque()
+        self.idle_heap = []
+        for i, s in enumerate(self.servers):
+            s.pos = i
+            self.schedule_transition(s)
+            if s.is_idle():
+                self.release_instance(s)
+
+        # local names for everything used on each event, saving attribute lookups in the loop
+        servers = self.servers
+        event_heap = self.event_heap
+        heappop = heapq.heappop
+        termination_queue = self.termination_queue
+        termination_popleft = termination_queue.popleft
+        hist_times_append = self.hist_times.append
+        trace_condition = self.trace_condition
+        update_hist_arrays = self.update_hist_arrays
+        has_server = self.has_server
+        is_warm_available = self.is_warm_available
+        warm_start_arrival = self.warm_start_arrival
+        cold_start_arrival = self.cold_start_arrival
+        schedule_transition = self.schedule_transition
+        release_instance = self.release_instance
+        generate_arrivals = self.generate_arrivals
+        num_arrivals = len(arrivals)
+
+        while trace_condition(t):
             if progress:
                 if int(t - pbar_t_update) > pbar_interval:
                     pbar.update(int(t) - pbar_t_update)
                     pbar_t_update = int(t)
-            self.hist_times.append(t)
-            self.update_hist_arrays(t)
+            hist_times_append(t)
+            update_hist_arrays(t)
             if debug_print:
                 print()
                 print(f"Time: {t:.2f} \t NextArrival: {next_arrival:.2f}")
                 print(self)
                 # print state of all servers
-                [print(s) for s in self.servers]
+                [print(s) for s in servers]
 
             # if there are no servers, next transition is arrival
-            if self.has_server() == False:
+            if has_server() == False:
                 t = next_arrival
-                next_arrival = t + self.req()
+                arrival_idx += 1
+                if arrival_idx == num_arrivals:
+                    arrivals = generate_arrivals(t)
+                    num_arrivals = len(arrivals)
+                    arrival_idx = 0
+                next_arrival = arrivals[arrival_idx]
                 # no servers, so cold start
-                self.cold_start_arrival(t)
+                cold_start_arrival(t)
                 continue
 
-            # if there are servers, next transition is the soonest one
-            server_next_transitions = np.array([s.get_next_transition_time(t) for s in self.servers])
+            # if there are servers, next transition is the soonest one in either queue,
+            # discarding events outdated by a later rescheduling of their instance
+            while event_heap and event_heap[0][2] != event_heap[0][3].version:
+                heappop(event_heap)
+            while termination_queue and termination_queue[0][2] != termination_queue[0][3].version:
+                termination_popleft()
+            if termination_queue and (not event_heap or termination_queue[0] < event_heap[0]):
+                event = termination_queue[0]
+                is_queued_termination = True
+            else:
+                event = event_heap[0]
+                is_queued_termination = False
+            next_transition = event[0]
 
             # if next transition is arrival
-            if (next_arrival - t) < server_next_transitions.min():
+            if next_arrival < next_transition:
                 t = next_arrival
-                next_arrival = t + self.req()
+                arrival_idx += 1
+                if arrival_idx == num_arrivals:
+                    arrivals = generate_arrivals(t)
+                    num_arrivals = len(arrivals)
+                    arrival_idx = 0
+                next_arrival = arrivals[arrival_idx]
 
                 # if warm start
-                if self.is_warm_available(t):
-                    self.warm_start_arrival(t)
+                if is_warm_available(t):
+                    warm_start_arrival(t)
                 # if cold start
                 else:
-                    self.cold_start_arrival(t)
+                    cold_start_arrival(t)
                 continue
 
             # if next transition is a state change in one of servers
             else:
                 # find the server that needs transition
-                idx = server_next_transitions.argmin()
-                t = t + server_next_transitions[idx]
-                new_state = self.servers[idx].make_transition()
+                if is_queued_termination:
+                    termination_popleft()
+                else:
+                    heappop(event_heap)
+                server = event[3]
+                t = next_transition
+                new_state = server.make_transition()
                 # delete instance if it was just terminated
-                if new_state == 'TERM':
-                    self.prev_servers.append(self.servers[idx])
+                if new_state == TERM:
+                    idx = server.pos
+                    self.archive_instance(server)
                     self.idle_count -= 1
                     self.server_count -= 1
-                    del self.servers[idx]
+                    # the order of servers carries no meaning, fill the gap with the last one
+                    last = servers.pop()
+                    if idx != len(servers):
+                        servers[idx] = last
+                        last.pos = idx
                     if debug_print:
                         print(f"Termination for: # {idx}")
                 
                 # if request has done processing (exit event)
-                elif new_state == 'IDLE':
+                elif new_state == IDLE:
                     # transition from running to idle
                     self.running_count -= 1
                     self.idle_count += 1
+                    schedule_transition(server)
+                    release_instance(server)
                 else:
                     # force this only if we are running current class, not child classes
                     if self.__class__ == ServerlessSimulator:
-                        raise Exception(f"Unknown transition in states: {new_state}")
+                        raise Exception(f"Unknown transition in states: {STATE_NAMES[new_state]}")
+                    schedule_transition(server)
 
         # after the trace loop, append the last time recorded
         self.hist_times.append(t)
@@ -668,9 +955,62 @@ class ServerlessSimulator:
         if progress:
             pbar.update(int(self.max_time) - pbar_t_update)
             pbar.close()
-        
 
+    @classmethod
+    def run_sweep(cls, param_grid, n_seeds=1, n_jobs=-1, seed=None, **kwargs):
+        """Generate traces for every combination of the parameters in `param_grid`, each repeated with `n_seeds` different seeds, spreading the runs over several processes.
 
+        Parameters
+        ----------
+        param_grid : dict
+            Maps each constructor argument to sweep on (e.g. `arrival_rate`) to the list of values it should take
+        n_seeds : int, optional
+            The number of independent traces generated for each combination, by default 1
+        n_jobs : int, optional
+            The number of worker processes, -1 uses all available CPUs and 1 runs everything in the current process, by default -1
+        seed : int, optional
+            Seed from which the seed of every run is derived, by default None
+        **kwargs
+            Constructor arguments shared by all runs
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per run, holding the swept parameters, the `seed` of the run and the values of :func:`get_result_dict`
+        """
+        names = list(param_grid.keys())
+        combinations = list(itertools.product(*[param_grid[name] for name in names]))
+        # independent seeds for all runs, so results don't depend on how runs are spread over workers
+        seeds = np.random.SeedSequence(seed).generate_state(len(combinations) * n_seeds).tolist()
+        tasks = []
+        for i, values in enumerate(combinations):
+            params = dict(zip(names, values))
+            for j in range(n_seeds):
+                tasks.append((cls, {**kwargs, **params}, params, seeds[i * n_seeds + j]))
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        # an empty grid has no runs and no workers to start
+        if n_jobs == 1 or len(tasks) == 0:
+            rows = [_run_sweep_task(task) for task in tasks]
+        else:
+            with multiprocessing.Pool(min(n_jobs, len(tasks))) as pool:
+                rows = pool.map(_run_sweep_task, tasks)
+        return pd.DataFrame(rows)
+
+
+def _run_sweep_task(task):
+    """Generate a single trace for :func:`ServerlessSimulator.run_sweep`, called in the worker processes.
+    """
+    sim_class, sim_kwargs, params, seed = task
+    # each run gets its own stream, the trace kernel is seeded from it as well
+    np.random.seed(seed)
+    sim = sim_class(**sim_kwargs)
+    sim.generate_trace()
+    row = dict(params)
+    row['seed'] = seed
+    row.update(sim.get_result_dict())
+    return row
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@
 # state is important and the initial process might be different from the
 # following service process.
 
-from simfaas.FunctionInstance import FunctionInstance
+from simfaas.FunctionInstance import FunctionInstance, IDLE
 from simfaas.ServerlessSimulator import ServerlessSimulator
 
 
@@ -57,7 +57,7 @@ class ExponentialServerlessTemporalSimulator(ServerlessTemporalSimulator):
                                 expiration_threshold
                                 )
 
-            f.state = 'IDLE'
+            f.state = IDLE
             f.is_cold = False
             # when will it be destroyed if no requests
             f.next_termination = next_term
@@ -73,7 +73,7 @@ class ExponentialServerlessTemporalSimulator(ServerlessTemporalSimulator):
                                 expiration_threshold
                                 )
 
-            f.state = 'IDLE'
+            f.state = IDLE
             f.is_cold = False
             # transition it into running mode
             f.arrival_transition(0)
@@ -112,7 +112,7 @@ if __name__ == "__main__":
                              expiration_threshold
                              )
 
-        f.state = 'IDLE'
+        f.state = IDLE
         f.is_cold = False
         # when will it be destroyed if no requests
         f.next_termination = 300
@@ -128,7 +128,7 @@ if __name__ == "__main__":
                              expiration_threshold
                              )
 
-        f.state = 'IDLE'
+        f.state = IDLE
         f.is_cold = False
         # transition it into running mode
         f.arrival_transition(0)
@@ -65,6 +65,30 @@ of the child classes.
         """
         raise NotImplementedError
 
+    def generate_traces(self, num_traces):
+        """generate_traces generates several samples at once, by default by calling
+:func:`~simfaas.SimProcess.SimProcess.generate_trace` repeatedly. Child classes able to sample
+in batches can override this function.
+
+        Parameters
+        ----------
+        num_traces : int
+            Number of samples to generate
+
+        Returns
+        -------
+        numpy.ndarray
+            The generated samples
+        """
+        return np.array([self.generate_trace() for i in range(num_traces)])
+
+    def reset(self):
+        """reset discards any state kept between samples, so that the samples generated next only
+depend on the state of the random number generator. Does nothing by default, child classes keeping
+samples ahead of time should override it.
+        """
+        pass
+
     def visualize(self, num_traces=10000, num_bins=100):
         """visualize function visualizes the PDF and CDF of the simulated process by generating
 traces from your function using :func:`~simfaas.SimProcess.SimProcess.generate_trace` and
@@ -78,7 +102,7 @@ PDF and CDF functions calculated analytically.
         num_bins : int, optional
             Number of bins for the histogram which created the density probabilities, by default 100
         """
-        traces = np.array([self.generate_trace() for i in range(num_traces)])
+        traces = self.generate_traces(num_traces)
         print(f"Simulated Average Inter-Event Time: {np.mean(traces):.6f}")
         print(f"Simulated Average Event Rate: {num_traces / np.sum(traces):.6f}")
 
@@ -110,13 +134,21 @@ which can be used for visualization purposes.
     ----------
     rate : float
         The rate at which the process should fire off
+    batch_size : int, optional
+        The number of samples drawn from the random number generator at once, which are then
+handed out one at a time by `generate_trace`, by default 4096
     """
-    def __init__(self, rate):
+    def __init__(self, rate, batch_size=4096):
         super().__init__()
 
         self.has_pdf = True
         self.has_cdf = True
         self.rate = rate
+        self.batch_size = batch_size
+
+        # the first batch is drawn lazily, so seeding after construction is respected
+        self.samples = []
+        self.sample_idx = 0
 
     def pdf(self, x):
         return expon.pdf(x, scale=1/self.rate)
@@ -124,8 +156,27 @@ which can be used for visualization purposes.
     def cdf(self, x):
         return expon.cdf(x, scale=1/self.rate)
 
+    def refill(self):
+        """Draw the next batch of samples used by `generate_trace`.
+        """
+        self.samples = np.random.exponential(1/self.rate, size=self.batch_size).tolist()
+        self.sample_idx = 0
+
+    def reset(self):
+        """Discard the samples left over from the current batch.
+        """
+        self.samples = []
+        self.sample_idx = 0
+
+    def generate_traces(self, num_traces):
+        return np.random.exponential(1/self.rate, size=num_traces)
+
     def generate_trace(self):
-        return np.random.exponential(1/self.rate)
+        if self.sample_idx == len(self.samples):
+            self.refill()
+        sample = self.samples[self.sample_idx]
+        self.sample_idx += 1
+        return sample
 
 
 class ConstSimProcess(SimProcess):
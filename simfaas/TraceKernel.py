@@ -0,0 +1,371 @@
+# A compiled version of the event loop in ServerlessSimulator.generate_trace for
+# the case where arrival, warm and cold service processes are all exponential.
+# Numba is an optional dependency, when it is absent, the simulator falls back
+# to the regular event loop.
+
+import heapq
+import math
+
+import numpy as np
+
+from simfaas.FunctionInstance import COLD, WARM, IDLE, TERM
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# request outcome recorded for each history step
+KERNEL_REQ_NONE = 0
+KERNEL_REQ_COLD = 1
+KERNEL_REQ_WARM = 2
+KERNEL_REQ_REJ = 3
+
+
+def _grow(arr, size):
+    """Return a copy of `arr` with `size` slots, keeping the existing values.
+    """
+    new_arr = np.empty(size, dtype=arr.dtype)
+    new_arr[:arr.shape[0]] = arr
+    return new_arr
+
+
+def _exponential(rate):
+    """Sample an exponential with the given `rate` by inversion, cheaper than `np.random.exponential` once compiled.
+    The samples follow the same distribution, although they may differ from it in the last bits.
+    """
+    # 1 - U lies in (0, 1], so the logarithm is always finite
+    return -math.log1p(-np.random.random()) / rate
+
+
+def run_exp_trace(seed, max_time, arrival_rate, warm_service_rate, cold_service_rate,
+                  expiration_threshold, maximum_concurrency, init_creation, init_departure,
+                  init_termination, init_state):
+    """Run the event loop of :func:`~simfaas.ServerlessSimulator.ServerlessSimulator.generate_trace`
+on plain arrays, starting from the instances described by the `init_*` arrays. Departures of the
+requests started by the kernel are sampled from the total service rate of the instances serving them
+instead of being drawn per instance, which gives the same distribution for exponential service times
+without scanning the instances on each event. Instances busy at the start keep their given departures.
+
+    Parameters
+    ----------
+    seed : int
+        Seed for the random number generator used inside the kernel
+    max_time : float
+        The time after which the simulation is stopped
+    arrival_rate : float
+        Rate of the exponential arrival process
+    warm_service_rate : float
+        Rate of the exponential warm service process
+    cold_service_rate : float
+        Rate of the exponential cold service process
+    expiration_threshold : float
+        Idle time after which an instance is terminated
+    maximum_concurrency : float
+        Maximum number of instances processing requests at the same time, requests are rejected when
+        exactly this many are busy, as in the regular event loop
+    init_creation : numpy.ndarray
+        Creation times of the instances present at the start of the trace
+    init_departure : numpy.ndarray
+        Next departures of the instances present at the start of the trace
+    init_termination : numpy.ndarray
+        Next terminations of the instances present at the start of the trace
+    init_state : numpy.ndarray
+        States of the instances present at the start of the trace
+
+    Returns
+    -------
+    tuple
+        (hist_times, hist_server_count, hist_running_count, hist_idle_count, hist_req, prev_creation,
+        prev_termination, creation, departure, termination, state) where `hist_req` holds one of the
+        `KERNEL_REQ_*` values for each history step, `prev_*` describe the terminated instances and
+        the rest describe the instances still alive at the end of the trace.
+    """
+    np.random.seed(seed)
+
+    # With exponential service times, only the number of busy instances of each kind matters: the
+    # next departure among them is exponential with the sum of their rates, and the departing one
+    # is uniform among the instances of the kind picked in proportion to its total rate. Slots are
+    # kept in place for the life of an instance and recycled through `free_slots` so references
+    # from the busy lists and the termination queue stay valid.
+    n = init_state.shape[0]
+    # slots are grown as instances are created, the concurrency limit may be infinite
+    size = max(n, 64)
+    creation = _grow(init_creation, size)
+    termination = _grow(init_termination, size)
+    state = _grow(init_state, size)
+    # order in which instances joined, breaks ties between equal creation times
+    rank = np.arange(size)
+    next_rank = n
+    # bumped each time an instance stops being idle, invalidates its queued termination
+    version = np.zeros(size, dtype=np.int64)
+    free_slots = np.empty(size, dtype=np.int64)
+    free_count = 0
+    # slots in use are below slot_count
+    slot_count = n
+
+    # busy instances by kind, a departing one is removed by moving the last one into its place.
+    # Instances busy at the start are not part of these until they are reused, since their
+    # departures are given rather than exponential
+    cold_busy = np.empty(size, dtype=np.int64)
+    warm_busy = np.empty(size, dtype=np.int64)
+    cold_count = 0
+    warm_count = 0
+
+    # terminations are due expiration_threshold after a departure and departures are processed in
+    # time order, so a FIFO queue stays sorted. Instances idle at the start may terminate at any
+    # time and are kept apart, sorted once, as are the given departures of instances busy at the start.
+    queue_slot = np.empty(1024, dtype=np.int64)
+    queue_version = np.empty(1024, dtype=np.int64)
+    queue_head = 0
+    queue_tail = 0
+    init_idle = np.empty(n, dtype=np.int64)
+    init_idle_count = 0
+    init_busy = np.empty(n, dtype=np.int64)
+    init_busy_count = 0
+    # whether an instance busy at the start has yet to reach its given departure
+    init_pending = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        if state[i] == IDLE:
+            init_idle[init_idle_count] = i
+            init_idle_count += 1
+        else:
+            init_busy[init_busy_count] = i
+            init_busy_count += 1
+            init_pending[i] = True
+    init_idle = init_idle[:init_idle_count]
+    init_idle = init_idle[np.argsort(termination[init_idle], kind='mergesort')]
+    init_idle_head = 0
+    init_busy = init_busy[:init_busy_count]
+    init_busy = init_busy[np.argsort(init_departure[init_busy], kind='mergesort')]
+    init_busy_head = 0
+
+    running_count = init_busy_count
+    idle_count = init_idle_count
+
+    # idle instances, newest first with ties going to the one that joined first. Entries of
+    # instances reused or terminated since they were pushed are discarded by checking the version
+    idle_heap = [(0.0, 0, 0, 0)]
+    idle_heap.pop()
+    for i in init_idle:
+        heapq.heappush(idle_heap, (-creation[i], rank[i], i, version[i]))
+
+    # history, grown geometrically
+    hist_times = np.empty(1024, dtype=np.float64)
+    hist_server_count = np.empty(1024, dtype=np.int64)
+    hist_running_count = np.empty(1024, dtype=np.int64)
+    hist_idle_count = np.empty(1024, dtype=np.int64)
+    hist_req = np.empty(1024, dtype=np.int8)
+    hist_n = 0
+
+    # archive of terminated instances
+    prev_creation = np.empty(64, dtype=np.float64)
+    prev_termination = np.empty(64, dtype=np.float64)
+    prev_n = 0
+
+    t = 0.0
+    next_arrival = t + _exponential(arrival_rate)
+    while t < max_time:
+        if hist_n == hist_times.shape[0]:
+            size = 2 * hist_n
+            hist_times = _grow(hist_times, size)
+            hist_server_count = _grow(hist_server_count, size)
+            hist_running_count = _grow(hist_running_count, size)
+            hist_idle_count = _grow(hist_idle_count, size)
+            hist_req = _grow(hist_req, size)
+        hist_times[hist_n] = t
+        hist_server_count[hist_n] = running_count + idle_count
+        hist_running_count[hist_n] = running_count
+        hist_idle_count[hist_n] = idle_count
+        hist_req[hist_n] = KERNEL_REQ_NONE
+        hist_n += 1
+
+        # soonest termination, skipping instances that were reused since they were queued
+        while init_idle_head < init_idle_count and version[init_idle[init_idle_head]] != 0:
+            init_idle_head += 1
+        while queue_head < queue_tail and \
+                version[queue_slot[queue_head]] != queue_version[queue_head]:
+            queue_head += 1
+        term_idx = -1
+        next_termination = np.inf
+        if init_idle_head < init_idle_count:
+            term_idx = init_idle[init_idle_head]
+            next_termination = termination[term_idx]
+        if queue_head < queue_tail and termination[queue_slot[queue_head]] < next_termination:
+            term_idx = queue_slot[queue_head]
+            next_termination = termination[term_idx]
+
+        # next departure, among the instances busy at the start or the others
+        next_init_departure = np.inf
+        if init_busy_head < init_busy_count:
+            next_init_departure = init_departure[init_busy[init_busy_head]]
+        cold_rate = cold_count * cold_service_rate
+        busy_rate = cold_rate + warm_count * warm_service_rate
+        next_departure = np.inf
+        if busy_rate > 0:
+            next_departure = t + _exponential(busy_rate)
+        if next_init_departure < next_departure:
+            next_departure = next_init_departure
+
+        # next transition is an arrival
+        if next_arrival < next_departure and next_arrival < next_termination:
+            t = next_arrival
+            next_arrival = t + _exponential(arrival_rate)
+
+            if running_count == maximum_concurrency:
+                hist_req[hist_n - 1] = KERNEL_REQ_REJ
+
+            # warm start on the newest idle instance
+            elif idle_count > 0:
+                hist_req[hist_n - 1] = KERNEL_REQ_WARM
+                while True:
+                    _, _, newest, newest_version = heapq.heappop(idle_heap)
+                    if version[newest] == newest_version and state[newest] == IDLE:
+                        break
+                state[newest] = WARM
+                version[newest] += 1
+                warm_busy[warm_count] = newest
+                warm_count += 1
+                idle_count -= 1
+                running_count += 1
+
+            # cold start on a new instance
+            else:
+                hist_req[hist_n - 1] = KERNEL_REQ_COLD
+                if free_count > 0:
+                    free_count -= 1
+                    idx = free_slots[free_count]
+                else:
+                    if slot_count == creation.shape[0]:
+                        size = 2 * slot_count
+                        creation = _grow(creation, size)
+                        termination = _grow(termination, size)
+                        state = _grow(state, size)
+                        rank = _grow(rank, size)
+                        version = _grow(version, size)
+                        free_slots = _grow(free_slots, size)
+                        cold_busy = _grow(cold_busy, size)
+                        warm_busy = _grow(warm_busy, size)
+                    idx = slot_count
+                    version[idx] = 0
+                    slot_count += 1
+                creation[idx] = t
+                rank[idx] = next_rank
+                next_rank += 1
+                state[idx] = COLD
+                cold_busy[cold_count] = idx
+                cold_count += 1
+                running_count += 1
+
+        # next transition is a departure, either the next given one or from a cold or warm
+        # instance in proportion to their rates
+        elif next_departure < next_termination:
+            t = next_departure
+            if next_departure == next_init_departure:
+                idx = init_busy[init_busy_head]
+                init_busy_head += 1
+                init_pending[idx] = False
+            elif np.random.random() * busy_rate < cold_rate:
+                pos = np.random.randint(cold_count)
+                idx = cold_busy[pos]
+                cold_count -= 1
+                cold_busy[pos] = cold_busy[cold_count]
+            else:
+                pos = np.random.randint(warm_count)
+                idx = warm_busy[pos]
+                warm_count -= 1
+                warm_busy[pos] = warm_busy[warm_count]
+            state[idx] = IDLE
+            termination[idx] = t + expiration_threshold
+            if queue_tail == queue_slot.shape[0]:
+                # drop the consumed head before growing
+                live = queue_tail - queue_head
+                queue_slot[:live] = queue_slot[queue_head:queue_tail]
+                queue_version[:live] = queue_version[queue_head:queue_tail]
+                queue_head = 0
+                queue_tail = live
+                if 2 * live > queue_slot.shape[0]:
+                    queue_slot = _grow(queue_slot, 2 * queue_slot.shape[0])
+                    queue_version = _grow(queue_version, 2 * queue_version.shape[0])
+            queue_slot[queue_tail] = idx
+            queue_version[queue_tail] = version[idx]
+            queue_tail += 1
+            running_count -= 1
+            idle_count += 1
+
+            heapq.heappush(idle_heap, (-creation[idx], rank[idx], idx, version[idx]))
+            # terminated instances sink below newer ones and are never popped, drop
+            # outdated entries once they outnumber the ones of idle instances
+            if len(idle_heap) > 2 * idle_count + 64:
+                live = 0
+                for k in range(len(idle_heap)):
+                    entry = idle_heap[k]
+                    if version[entry[2]] == entry[3] and state[entry[2]] == IDLE:
+                        idle_heap[live] = entry
+                        live += 1
+                while len(idle_heap) > live:
+                    idle_heap.pop()
+                heapq.heapify(idle_heap)
+
+        # next transition is a termination
+        else:
+            t = next_termination
+            idx = term_idx
+            if prev_n == prev_creation.shape[0]:
+                prev_creation = _grow(prev_creation, 2 * prev_n)
+                prev_termination = _grow(prev_termination, 2 * prev_n)
+            prev_creation[prev_n] = creation[idx]
+            prev_termination[prev_n] = termination[idx]
+            prev_n += 1
+
+            state[idx] = TERM
+            version[idx] += 1
+            free_slots[free_count] = idx
+            free_count += 1
+            idle_count -= 1
+
+    # after the trace loop, append the last time recorded
+    if hist_n == hist_times.shape[0]:
+        hist_times = _grow(hist_times, hist_n + 1)
+    hist_times[hist_n] = t
+
+    # gather the live instances, drawing the residual service time of the busy ones that did not
+    # have a given departure
+    live_count = running_count + idle_count
+    out_creation = np.empty(live_count, dtype=np.float64)
+    out_departure = np.empty(live_count, dtype=np.float64)
+    out_termination = np.empty(live_count, dtype=np.float64)
+    out_state = np.empty(live_count, dtype=state.dtype)
+    out_rank = np.empty(live_count, dtype=np.int64)
+    j = 0
+    for i in range(slot_count):
+        if state[i] == TERM:
+            continue
+        out_creation[j] = creation[i]
+        out_state[j] = state[i]
+        out_rank[j] = rank[i]
+        if state[i] == IDLE:
+            out_departure[j] = termination[i] - expiration_threshold
+            out_termination[j] = termination[i]
+        elif i < n and init_pending[i]:
+            out_departure[j] = init_departure[i]
+            out_termination[j] = termination[i]
+        else:
+            if state[i] == COLD:
+                out_departure[j] = t + _exponential(cold_service_rate)
+            else:
+                out_departure[j] = t + _exponential(warm_service_rate)
+            out_termination[j] = out_departure[j] + expiration_threshold
+        j += 1
+    # keep the live instances in the order they joined
+    order = np.argsort(out_rank)
+
+    return (hist_times[:hist_n + 1], hist_server_count[:hist_n], hist_running_count[:hist_n],
+            hist_idle_count[:hist_n], hist_req[:hist_n], prev_creation[:prev_n], prev_termination[:prev_n],
+            out_creation[order], out_departure[order], out_termination[order], out_state[order])
+
+
+if numba is not None:
+    _grow = numba.njit(cache=True)(_grow)
+    _exponential = numba.njit(cache=True)(_exponential)
+    run_exp_trace = numba.njit(cache=True)(run_exp_trace)